@@ -0,0 +1,44 @@
+"""
+Configuration for the experiment scripts.
+
+Environment variables are read once at import into a frozen Config, so scripts
+don't look them up on every call and can check for missing settings up front.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+@dataclass(frozen=True)
+class Config:
+    """
+    Galileo and OpenAI settings read from environment variables.
+    """
+    galileo_api_key: Optional[str]
+    galileo_api_url: Optional[str]
+    galileo_project: Optional[str]
+    galileo_project_id: Optional[str]
+    openai_api_key: Optional[str]
+    resume_experiment_id: Optional[str]
+    prefetch_llm_responses: bool
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        """
+        Build the config from the current environment.
+        """
+        return cls(
+            galileo_api_key=os.environ.get("GALILEO_API_KEY"),
+            galileo_api_url=os.environ.get("GALILEO_API_URL"),
+            galileo_project=os.environ.get("GALILEO_PROJECT"),
+            galileo_project_id=os.environ.get("GALILEO_PROJECT_ID"),
+            openai_api_key=os.environ.get("OPENAI_API_KEY"),
+            resume_experiment_id=os.environ.get("GALILEO_RESUME_EXPERIMENT_ID"),
+            prefetch_llm_responses=os.environ.get("PREFETCH_LLM_RESPONSES", "true").lower() not in ("0", "false", "no")
+        )
+
+CONFIG = Config.from_env()
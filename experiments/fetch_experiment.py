@@ -7,40 +7,118 @@ It uses the traces search endpoint to find traces, then fetches detailed trace i
 showing custom metrics, explanations, rationales, and other metric details at the trace level.
 """
 
-import os
-import requests
-from dotenv import load_dotenv
+import asyncio
+import io
+import itertools
+import re
+import sys
+import time
+from collections import deque
+import httpx
+import msgspec
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+from config import CONFIG
 
-# Load environment variables
-load_dotenv()
+MAX_CONCURRENT_PAGES = 8
 
-def fetch_experiment_traces(experiment_id: str, project_id: str = None, limit: int = 100) -> dict:
+# Local cache of fetched experiment traces. Entries always expire after the TTL: metrics
+# are scored asynchronously after a trace completes, so complete traces can still change.
+TRACES_CACHE_DIR = Path("~/.cache/galileo/traces").expanduser()
+TRACES_CACHE_TTL_SECONDS = 60 * 60
+
+# Metric detail keys (judge counts, costs, explanations, ...) dropped from trace metrics
+_METRIC_DETAIL_SUFFIX_RE = re.compile(r"_(num_judges|metric_cost|explanation|status|rationale|model_alias)$")
+
+
+class TraceRecord(msgspec.Struct):
     """
-    Fetch traces for an experiment from Galileo API using the search endpoint.
-    Documentation: https://v2docs.galileo.ai/api-reference/trace/query-traces
+    A trace from the search endpoint. Fields not listed here are skipped when decoding.
+    Input and output are left untyped, since they can be message lists as well as text.
+    """
+    id: Optional[str] = None
+    created_at: Optional[str] = None
+    name: Optional[str] = None
+    is_complete: Optional[bool] = None
+    input: Any = None
+    output: Any = None
+    metrics: Optional[Dict[str, Any]] = None
+
+
+class TracesPage(msgspec.Struct):
+    """
+    A page of traces search results.
+    """
+    num_records: Optional[int] = None
+    records: List[TraceRecord] = []
+    next_starting_token: Any = None
+
+
+_traces_page_decoder = msgspec.json.Decoder(TracesPage)
+
+
+def _display(value: Any) -> Any:
+    """
+    Show missing trace fields as N/A.
+    """
+    return 'N/A' if value is None else value
+
+
+def _load_cached_traces(experiment_id: str) -> Optional[TracesPage]:
+    """
+    Load cached traces for an experiment, if present and still valid.
+    """
+    path = TRACES_CACHE_DIR / f"{experiment_id}.json"
+    try:
+        age = time.time() - path.stat().st_mtime
+        if age >= TRACES_CACHE_TTL_SECONDS:
+            return None
+        return _traces_page_decoder.decode(path.read_bytes())
+    except (OSError, msgspec.DecodeError):
+        return None
+
+
+def _store_cached_traces(experiment_id: str, traces_data: TracesPage) -> None:
+    """
+    Atomically write fetched traces for an experiment to the cache.
+    Best effort: if the cache can't be written, the traces are just not cached.
+    """
+    path = TRACES_CACHE_DIR / f"{experiment_id}.json"
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        TRACES_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(msgspec.json.encode(traces_data))
+        tmp_path.replace(path)
+    except OSError:
+        pass
+
+
+async def _fetch_trace_pages(experiment_id: str, project_id: Optional[str], limit: int) -> AsyncIterator[TracesPage]:
+    """
+    Fetch traces for an experiment from the search endpoint.
     
-    Args:
-        experiment_id (str): The experiment ID
-        project_id (str, optional): The project ID. If not provided, uses GALILEO_PROJECT_ID env var
-        limit (int): Maximum number of traces to return (default: 100)
-        
-    Returns:
-        dict: Traces search results
+    The first page reports the total number of traces. When page tokens are record
+    offsets, the remaining pages are then requested concurrently over a single pooled
+    HTTP/2 client and yielded in order as they arrive. Otherwise, or if the total is
+    missing, pages are fetched one at a time by following next_starting_token.
+    Records are decoded into TraceRecord and trimmed to main metric values.
     """
     if project_id is None:
-        project_id = os.environ.get("GALILEO_PROJECT_ID")
+        project_id = CONFIG.galileo_project_id
         if not project_id:
             raise ValueError("GALILEO_PROJECT_ID environment variable is required")
     
-    api_key = os.environ.get("GALILEO_API_KEY")
-    api_url = os.environ.get("GALILEO_API_URL")
-    
-    if not api_key or not api_url:
+    if not CONFIG.galileo_api_key or not CONFIG.galileo_api_url:
         raise ValueError("GALILEO_API_KEY and GALILEO_API_URL environment variables are required")
     
     # Construct API URL for traces search
-    url = f"{api_url}/v2/projects/{project_id}/traces/search"
-    headers = {"Galileo-API-Key": api_key, "Content-Type": "application/json"}
+    url = f"{CONFIG.galileo_api_url}/v2/projects/{project_id}/traces/search"
+    # Ask for compressed responses; httpx decodes br when the brotli package is installed
+    headers = {
+        "Galileo-API-Key": CONFIG.galileo_api_key,
+        "Content-Type": "application/json",
+        "Accept-Encoding": "br, gzip"
+    }
     
     # Request payload for searching traces by experiment_id
     payload = {
@@ -54,73 +132,198 @@ def fetch_experiment_traces(experiment_id: str, project_id: str = None, limit: i
         }
     }
     
+    async with httpx.AsyncClient(
+        http2=True,
+        headers=headers,
+        limits=httpx.Limits(max_connections=MAX_CONCURRENT_PAGES),
+        timeout=30
+    ) as client:
+        async def fetch_page(starting_token: int) -> TracesPage:
+            response = await client.post(url, json={**payload, "starting_token": starting_token})
+            response.raise_for_status()
+            page = _traces_page_decoder.decode(response.content)
+            for record in page.records:
+                record.metrics = {
+                    metric_name: metric_value
+                    for metric_name, metric_value in (record.metrics or {}).items()
+                    if not _METRIC_DETAIL_SUFFIX_RE.search(metric_name)
+                }
+            return page
+        
+        first_page = await fetch_page(0)
+        yield first_page
+        
+        # Check if we have more pages
+        if first_page.next_starting_token is None or len(first_page.records) < limit:
+            return
+        
+        # If tokens are record offsets and the total is known, fetch the remaining pages
+        # concurrently. At most MAX_CONCURRENT_PAGES are in flight, so each page is handed
+        # to the caller while later ones are still downloading, and only a window of pages
+        # is held in memory.
+        if first_page.next_starting_token == limit and (first_page.num_records or 0) > limit:
+            offsets = iter(range(limit, first_page.num_records, limit))
+        else:
+            offsets = iter(())
+        pending = deque(
+            (offset, asyncio.create_task(fetch_page(offset)))
+            for offset in itertools.islice(offsets, MAX_CONCURRENT_PAGES)
+        )
+        next_token = first_page.next_starting_token
+        try:
+            while True:
+                if pending and pending[0][0] == next_token:
+                    _, task = pending.popleft()
+                    page = await task
+                    next_offset = next(offsets, None)
+                    if next_offset is not None:
+                        pending.append((next_offset, asyncio.create_task(fetch_page(next_offset))))
+                else:
+                    # The reported token isn't the next prefetched offset: drop the prefetched
+                    # pages and follow next_starting_token one page at a time
+                    for _, task in pending:
+                        task.cancel()
+                    pending.clear()
+                    offsets = iter(())
+                    page = await fetch_page(next_token)
+                yield page
+                
+                next_token = page.next_starting_token
+                if next_token is None or len(page.records) < limit:
+                    break
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+
+async def iter_experiment_traces(experiment_id: str, project_id: str = None, limit: int = 100,
+                                 use_cache: bool = True) -> AsyncIterator[TracesPage]:
+    """
+    Fetch traces for an experiment from Galileo API page by page using the search endpoint.
+    Documentation: https://v2docs.galileo.ai/api-reference/trace/query-traces
+    
+    Results are cached under TRACES_CACHE_DIR for TRACES_CACHE_TTL_SECONDS, so repeat
+    fetches of the same experiment are served from disk as a single page.
+    
+    Args:
+        experiment_id (str): The experiment ID
+        project_id (str, optional): The project ID. If not provided, uses GALILEO_PROJECT_ID env var
+        limit (int): Maximum number of traces per page (default: 100)
+        use_cache (bool): Whether to serve cached traces. Fetched traces are cached either way
+        
+    Yields:
+        TracesPage: Traces search results for each page
+    """
+    if use_cache:
+        cached = _load_cached_traces(experiment_id)
+        if cached is not None:
+            yield cached
+            return
+    
+    num_records = None
+    records = []
+    async for page in _fetch_trace_pages(experiment_id, project_id, limit):
+        if num_records is None:
+            num_records = page.num_records
+        records.extend(page.records)
+        yield page
+    
+    _store_cached_traces(experiment_id, TracesPage(num_records=num_records, records=records))
+
+
+def fetch_experiment_traces(experiment_id: str, project_id: str = None, limit: int = 100,
+                            use_cache: bool = True) -> TracesPage:
+    """
+    Fetch all traces for an experiment from Galileo API.
+    
+    Args:
+        experiment_id (str): The experiment ID
+        project_id (str, optional): The project ID. If not provided, uses GALILEO_PROJECT_ID env var
+        limit (int): Maximum number of traces per page (default: 100)
+        use_cache (bool): Whether to serve cached traces (default: True)
+        
+    Returns:
+        TracesPage: Traces search results (paginated results combined)
+    """
+    async def collect_pages() -> list:
+        return [page async for page in iter_experiment_traces(experiment_id, project_id, limit, use_cache)]
+    
     try:
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()
+        pages = asyncio.run(collect_pages())
     except Exception as e:
         print(f"Error fetching experiment traces: {e}")
-        return {}
+        return TracesPage()
+    
+    return TracesPage(
+        num_records=pages[0].num_records,
+        records=[record for page in pages for record in page.records]
+    )
 
 
-def print_traces_summary(traces_data: dict) -> None:
+async def print_traces_summary(pages: AsyncIterable[TracesPage]) -> None:
     """
     Print a formatted summary of trace results using search API data.
     
     Shows trace-level metrics from the search results including custom metrics,
-    explanations, rationales, costs, and model information. Focuses on the first 5 traces.
+    explanations, rationales, costs, and model information. Traces are printed
+    page by page as they are fetched.
     
     Args:
-        traces_data (dict): Traces data from search API
+        pages (AsyncIterable[TracesPage]): Pages of traces data from search API
     """
-    print("\n" + "="*60)
-    print("EXPERIMENT TRACES WITH METRIC INFO")
-    print("="*60)
+    # Buffer output so each page is written to stdout in a single call
+    buf = io.StringIO()
+    print("\n" + "="*60, file=buf)
+    print("EXPERIMENT TRACES WITH METRIC INFO", file=buf)
+    print("="*60, file=buf)
     
-    # Basic info
-    num_records = traces_data.get('num_records', 0)
-    records = traces_data.get('records', [])
-    
-    print(f"\nTotal Traces Found: {num_records}")
-    print(f"Records Returned: {len(records)}")
-    
-    if not records:
-        print("\nNo traces found for this experiment.")
-        return
-    
-    # Process each trace from search results
-    for i, trace_record in enumerate(records):  # Limit to first 5 traces
-        trace_id = trace_record.get('id')
-        if not trace_id:
-            continue
-            
-        print(f"\n{'='*50}")
-        print(f"TRACE {i+1}: {trace_id}")
-        print(f"{'='*50}")
+    num_returned = 0
+    is_first_page = True
+    async for page in pages:
+        # Total count comes from the first page
+        if is_first_page:
+            print(f"\nTotal Traces Found: {_display(page.num_records)}", file=buf)
+            is_first_page = False
         
-        # Show basic trace info from search results
-        print(f"  Created: {trace_record.get('created_at', 'N/A')}")
-        print(f"  Name: {trace_record.get('name', 'N/A')}")
-        print(f"  Complete: {trace_record.get('is_complete', 'N/A')}")
-        
-        # Show input and output
-        input_data = trace_record.get('input', '')
-        if input_data:
-            print(f"  Input: {input_data}")
-        
-        output_data = trace_record.get('output', '')
-        if output_data:
-            print(f"  Output: {output_data}")
+        # Process each trace from search results
+        for trace_record in page.records:
+            trace_id = trace_record.id
+            if not trace_id:
+                continue
+            num_returned += 1
+            
+            print(f"\n{'='*50}", file=buf)
+            print(f"TRACE {num_returned}: {trace_id}", file=buf)
+            print(f"{'='*50}", file=buf)
+            
+            # Show basic trace info from search results
+            print(f"  Created: {_display(trace_record.created_at)}", file=buf)
+            print(f"  Name: {_display(trace_record.name)}", file=buf)
+            print(f"  Complete: {_display(trace_record.is_complete)}", file=buf)
+            
+            # Show input and output
+            if trace_record.input:
+                print(f"  Input: {trace_record.input}", file=buf)
+            
+            if trace_record.output:
+                print(f"  Output: {trace_record.output}", file=buf)
+            
+            # Show metric scores only
+            metric_data = trace_record.metrics
+            if metric_data:
+                print("\n", file=buf)
+                print(f"Metric Data:", file=buf)
+                for metric_name, metric_value in metric_data.items():
+                    print(f"{metric_name}: {metric_value}", file=buf)
         
-        # Show metric scores only
-        metric_data = trace_record.get('metrics', {})
-        if metric_data:
-            print("\n")
-            print(f"Metric Data:")
-            for metric_name, metric_value in metric_data.items():
-                # Only show the main metric values, not the detailed breakdowns
-                if not any(suffix in metric_name for suffix in ['_num_judges', '_metric_cost', '_explanation', '_status', '_rationale', '_model_alias']):
-                    print(f"{metric_name}: {metric_value}")
+        sys.stdout.write(buf.getvalue())
+        buf = io.StringIO()
+    
+    if not num_returned:
+        print("\nNo traces found for this experiment.", file=buf)
+    else:
+        print(f"\nRecords Returned: {num_returned}", file=buf)
+    sys.stdout.write(buf.getvalue())
     
 
 def main():
@@ -130,30 +333,28 @@ def main():
     Fetches traces for an experiment and displays comprehensive metric details
     including custom metrics, explanations, rationales, and other metadata.
     """
-    import sys
+    args = sys.argv[1:]
+    use_cache = "--no-cache" not in args
+    args = [arg for arg in args if arg != "--no-cache"]
     
-    if len(sys.argv) < 2 or len(sys.argv) > 3:
-        print("Usage: python fetch_experiment.py <experiment_id> [limit]")
+    if len(args) < 1 or len(args) > 2:
+        print("Usage: python fetch_experiment.py <experiment_id> [limit] [--no-cache]")
         print("  experiment_id: The experiment ID to fetch traces for")
-        print("  limit: Maximum number of traces to return (default: 100)")
+        print("  limit: Maximum number of traces per page (default: 100)")
+        print("  --no-cache: Fetch from the API even if traces are cached")
         sys.exit(1)
     
-    experiment_id = sys.argv[1]
-    limit = int(sys.argv[2]) if len(sys.argv) == 3 else 100
+    experiment_id = args[0]
+    limit = int(args[1]) if len(args) == 2 else 100
     
     # Check if required environment variables are set
-    api_key = os.environ.get("GALILEO_API_KEY")
-    if not api_key:
+    if not CONFIG.galileo_api_key:
         print("GALILEO_API_KEY environment variable not set")
         return
     
     try:
-        # Fetch experiment traces
-        traces_data = fetch_experiment_traces(experiment_id, limit=limit)
-        if traces_data:
-            print_traces_summary(traces_data)
-        else:
-            print("No traces data found")
+        # Fetch experiment traces and print them page by page
+        asyncio.run(print_traces_summary(iter_experiment_traces(experiment_id, limit=limit, use_cache=use_cache)))
             
     except Exception as e:
         print(f"Error fetching experiment traces: {e}")
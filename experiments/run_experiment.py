@@ -6,19 +6,87 @@ This script fetches the legal advice dataset and runs an experiment
 to test the "Legal Advice Offered" metric.
 """
 
-import os
+import asyncio
+import functools
+import hashlib
+import json
+import shelve
 from galileo.datasets import get_dataset
 from galileo.experiments import run_experiment
 from galileo.schema.metrics import GalileoScorers
 from galileo.openai import openai
-from dotenv import load_dotenv
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from config import CONFIG
+from fetch_experiment import fetch_experiment_traces
 
-# Load environment variables
-load_dotenv()
+MODEL = "gpt-4o"
+MAX_CONCURRENT_REQUESTS = 8
+
+# On-disk cache of LLM responses, so re-running the experiment doesn't re-query OpenAI
+_cache = shelve.open(".llm_cache.db")
+
+# In-process responses by input text, so duplicate inputs within a run share one lookup
+_responses = {}
+
+
+# Retry transient OpenAI failures (rate limits, timeouts, 5xx) with jittered exponential backoff
+_retry_transient = retry(
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type((RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)),
+    reraise=True
+)
+
+@functools.lru_cache(maxsize=None)
+def _get_client():
+    """
+    Get the Galileo wrapped OpenAI client, created on first use so connections are
+    reused across rows. Not created at import, so main() can report a missing
+    OPENAI_API_KEY instead of the client raising.
+    """
+    return openai.OpenAI(api_key=CONFIG.openai_api_key)
+
+@functools.lru_cache(maxsize=None)
+def _get_async_client() -> AsyncOpenAI:
+    """
+    Get the plain (unwrapped) async client for the prefetch pass. It runs outside the
+    experiment, so the wrapped client would log its calls as stray traces in the
+    default log stream.
+    """
+    return AsyncOpenAI(api_key=CONFIG.openai_api_key)
+
+def _input_sha256(input_text: str) -> str:
+    """
+    Hash an input text. Matches the input_sha256 stored in dataset row metadata.
+    """
+    return hashlib.sha256(input_text.encode()).hexdigest()
+
+def _cache_key(input_sha256: str) -> str:
+    """
+    Build the cache key for an input from the model name and the input's sha256.
+    """
+    return f"{MODEL}:{input_sha256}"
+
+def _dataset_inputs(dataset) -> list:
+    """
+    Get the (input text, input sha256) pairs for each row of a dataset.
+    Uses the hash precomputed at dataset creation when the row has one.
+    """
+    inputs = []
+    for row in dataset.get_content().rows:
+        values = row.values_dict.to_dict()
+        metadata = values.get("metadata") or {}
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        input_text = values["input"]
+        inputs.append((input_text, metadata.get("input_sha256") or _input_sha256(input_text)))
+    return inputs
 
 def simple_llm_function(input_text: str) -> str:
     """
     Simple function that takes input and returns output using OpenAI.
+    Responses are cached on disk by model and input, so repeat runs skip the API call.
     Documentation: https://v2docs.galileo.ai/sdk-api/third-party-integrations/openai/openai
     
     Args:
@@ -27,32 +95,153 @@ def simple_llm_function(input_text: str) -> str:
     Returns:
         str: The LLM response
     """
-    # Initialize the Galileo wrapped OpenAI client
-    client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    if input_text in _responses:
+        return _responses[input_text]
     
-    # Make the API call
-    response = client.chat.completions.create(
+    key = _cache_key(_input_sha256(input_text))
+    if key in _cache:
+        output = _cache[key]
+    else:
+        output = _complete(input_text)
+        _cache[key] = output
+        _cache.sync()
+    
+    _responses[input_text] = output
+    return output
+
+@_retry_transient
+def _complete(input_text: str) -> str:
+    """
+    Make the OpenAI API call for a single input, retrying transient failures.
+    """
+    response = _get_client().chat.completions.create(
         messages=[{"role": "user", "content": input_text}],
-        model="gpt-4o"
+        model=MODEL
+    )
+    return response.choices[0].message.content
+
+@_retry_transient
+async def _acomplete(input_text: str) -> str:
+    """
+    Async version of _complete.
+    """
+    response = await _get_async_client().chat.completions.create(
+        messages=[{"role": "user", "content": input_text}],
+        model=MODEL
     )
-    
     return response.choices[0].message.content
 
+async def _fetch_response(input_text: str, key: str, semaphore: asyncio.Semaphore) -> None:
+    """
+    Run a single LLM call and store the response in the cache under key.
+    """
+    async with semaphore:
+        output = await _acomplete(input_text)
+    _cache[key] = output
+    _responses[input_text] = output
+
+async def prefetch_llm_responses(inputs: list) -> None:
+    """
+    Run the LLM calls for all dataset inputs concurrently and store them in the cache.
+    
+    run_experiment calls simple_llm_function one row at a time, so warming the cache
+    up front lets the OpenAI calls overlap instead of running back to back. Every
+    input's response is also loaded into memory, so the per-row calls are dict lookups.
+    
+    Inputs whose call fails are left out of the cache and fetched again when the
+    experiment reaches them.
+    
+    Args:
+        inputs (list): (input text, input sha256) pairs for the dataset rows
+    """
+    # Group by cache key, so duplicate inputs are only sent to OpenAI once
+    missing = {}
+    for input_text, input_sha256 in inputs:
+        key = _cache_key(input_sha256)
+        if key in _cache:
+            _responses[input_text] = _cache[key]
+        else:
+            missing[key] = input_text
+    if not missing:
+        return
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    try:
+        # A failed row must not lose the others: it is retried by simple_llm_function
+        # on its cache miss during the experiment
+        results = await asyncio.gather(
+            *[_fetch_response(input_text, key, semaphore) for key, input_text in missing.items()],
+            return_exceptions=True
+        )
+    finally:
+        _cache.sync()
+    
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        print(f"Prefetch failed for {len(errors)} of {len(missing)} inputs (first error: {errors[0]})")
+
+def seed_cache_from_experiment(experiment_id: str) -> int:
+    """
+    Seed the response cache with outputs from a previous experiment run.
+    
+    Used to resume an interrupted run: inputs that already have a trace in the
+    previous experiment are not sent to OpenAI again.
+    
+    Args:
+        experiment_id (str): The ID of the previous experiment
+        
+    Returns:
+        int: Number of responses added to the cache
+    """
+    traces_data = fetch_experiment_traces(experiment_id)
+    
+    num_seeded = 0
+    for trace in traces_data.records:
+        input_text = trace.input
+        output = trace.output
+        # Only plain-text traces match the string inputs and outputs the cache holds
+        if not isinstance(input_text, str) or not isinstance(output, str) or not input_text or not output:
+            continue
+        
+        key = _cache_key(_input_sha256(input_text))
+        if key not in _cache:
+            _cache[key] = output
+            num_seeded += 1
+    
+    _cache.sync()
+    return num_seeded
+
 def main():
     """
     Main function to run the experiment.
     """
-    # Check if required environment variables are set
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
+    # Check if required environment variables are set, before any API calls are made
+    if not CONFIG.openai_api_key:
         print("OPENAI_API_KEY environment variable not set")
         return
+    if not CONFIG.galileo_api_key:
+        print("GALILEO_API_KEY environment variable not set")
+        return
     
     try:
         # Get the dataset
         dataset = get_dataset(name="legal_advice_refusal_dataset")
         print(f"Dataset loaded: {dataset.name}")
         
+        # Reuse outputs from an interrupted experiment run, if one is given
+        if CONFIG.resume_experiment_id:
+            num_seeded = seed_cache_from_experiment(CONFIG.resume_experiment_id)
+            print(f"Resumed {num_seeded} responses from experiment {CONFIG.resume_experiment_id}")
+        
+        # Run the LLM calls for all rows concurrently before the experiment. This is only
+        # a speed-up: if it fails, rows are fetched one at a time during the experiment.
+        # Prefetched calls are made outside the experiment, so its traces get no LLM spans.
+        if CONFIG.prefetch_llm_responses:
+            try:
+                asyncio.run(prefetch_llm_responses(_dataset_inputs(dataset)))
+            except Exception as e:
+                print(f"Skipping response prefetch: {e}")
+        
         # Run the experiment
         results = run_experiment(
             "legal_advice_experiment",
@@ -62,7 +251,7 @@ def main():
                 "Legal Advice Offered", # custom metric
                 GalileoScorers.ground_truth_adherence
                 ],
-            project=os.environ.get("GALILEO_PROJECT")
+            project=CONFIG.galileo_project
         )
         print(results)
         experiment_id = results['experiment'].id
@@ -6,19 +6,182 @@ This module provides functions to fetch and parse logstream metrics from the Gal
 It allows you to get all metrics for a logstream using just the project name and logstream name.
 """
 
+import functools
+import hashlib
+import itertools
+import operator
 import os
+import time
+import orjson
 import requests
-from typing import Dict, Any, Optional
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Environment settings, resolved once at import (parameters still override them)
+_ENV_API_KEY = os.environ.get("GALILEO_API_KEY")
+_ENV_API_URL = os.environ.get("GALILEO_API_URL")
+_ENV_PROJECT = os.environ.get("GALILEO_PROJECT")
+_ENV_LOG_STREAM = os.environ.get("GALILEO_LOG_STREAM")
+
+# Shared session, so requests to the Galileo API reuse pooled keep-alive connections.
+# Mounted for both schemes, so a plain http:// GALILEO_API_URL (e.g. a local deployment)
+# gets the same pooling and retries.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    # Retry transient failures with exponential backoff, honouring Retry-After.
+    # POSTs are retried too: the search endpoints only read data.
+    max_retries=Retry(
+        total=5,
+        connect=3,
+        read=3,
+        status=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        respect_retry_after_header=True
+    )
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Ask for compressed responses. urllib3 only decodes br when brotli is installed,
+# so fall back to gzip without it.
+try:
+    import brotli  # noqa: F401
+    _SESSION.headers["Accept-Encoding"] = "br, gzip"
+except ImportError:
+    _SESSION.headers["Accept-Encoding"] = "gzip"
+
+# Number of search pages requested ahead of the one being processed
+PAGES_IN_FLIGHT = 4
+
+# Local cache of project and logstream name -> ID lookups, shared across runs
+IDS_CACHE_PATH = Path("~/.cache/galileo/ids.json").expanduser()
+IDS_CACHE_TTL_SECONDS = 60 * 60
+
+
+def _load_ids_cache() -> Dict[str, Dict[str, Any]]:
+    """
+    Load the name -> ID cache file, or an empty cache if it's missing, unreadable
+    or not a JSON object.
+    """
+    try:
+        ids = orjson.loads(IDS_CACHE_PATH.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+    return ids if isinstance(ids, dict) else {}
+
+
+def _write_ids_cache(ids: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Atomically write the name -> ID cache file.
+    Best effort: if the cache can't be written, lookups just aren't cached.
+    """
+    tmp_path = IDS_CACHE_PATH.with_suffix(".tmp")
+    try:
+        IDS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(orjson.dumps(ids))
+        tmp_path.replace(IDS_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def _get_cached_id(cache_key: str) -> Optional[str]:
+    """
+    Get an ID from the cache file, if present and not older than IDS_CACHE_TTL_SECONDS.
+    """
+    entry = _load_ids_cache().get(cache_key)
+    if not isinstance(entry, dict):
+        return None
+    
+    cached_at = entry.get("cached_at")
+    if not isinstance(cached_at, (int, float)) or time.time() - cached_at >= IDS_CACHE_TTL_SECONDS:
+        return None
+    return entry.get("id")
+
+
+def _store_cached_id(cache_key: str, id_value: str) -> None:
+    """
+    Write an ID through to the cache file.
+    """
+    ids = _load_ids_cache()
+    ids[cache_key] = {"id": id_value, "cached_at": time.time()}
+    _write_ids_cache(ids)
+
+
+def _drop_cached_ids(*cache_keys: str) -> None:
+    """
+    Remove stale IDs from the cache file and the in-memory lookup caches.
+    """
+    _lookup_project_id.cache_clear()
+    _lookup_logstream_id.cache_clear()
+    
+    ids = _load_ids_cache()
+    dropped = [ids.pop(cache_key) for cache_key in cache_keys if cache_key in ids]
+    if dropped:
+        _write_ids_cache(ids)
+
+
+def _project_cache_key(project_name: str, api_key: str, api_url: str) -> str:
+    """
+    Build the ID cache key for a project. Keyed by a short hash of the API key, so
+    accounts with same-named projects don't share IDs and the key isn't stored.
+    """
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    return f"project:{api_url}:{key_hash}:{project_name}"
+
+
+def _logstream_cache_key(project_id: str, logstream_name: str, api_key: str, api_url: str) -> str:
+    """
+    Build the ID cache key for a logstream, keyed like _project_cache_key.
+    """
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    return f"logstream:{api_url}:{key_hash}:{project_id}:{logstream_name}"
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_auth(api_key: Optional[str], api_url: Optional[str]) -> Tuple[str, str]:
+    """
+    Resolve the Galileo API key and URL from parameters or environment.
+    
+    Args:
+        api_key (str, optional): Galileo API key. If not provided, uses GALILEO_API_KEY env var
+        api_url (str, optional): Galileo API URL. If not provided, uses GALILEO_API_URL env var
+        
+    Returns:
+        Tuple[str, str]: The API key and URL
+        
+    Raises:
+        ValueError: If the API key or URL is missing
+    """
+    if api_key is None:
+        api_key = _ENV_API_KEY
+    if api_url is None:
+        api_url = _ENV_API_URL
+    
+    if not api_key:
+        raise ValueError("GALILEO_API_KEY is required")
+    if not api_url:
+        raise ValueError("GALILEO_API_URL is required")
+    
+    return api_key, api_url
+
 
 def get_project_id(project_name: str, api_key: Optional[str] = None, 
                    api_url: Optional[str] = None) -> str:
     """
     Get project ID from project name.
+    Lookups are cached in memory and in IDS_CACHE_PATH.
     
     Args:
         project_name (str): The project name
@@ -32,16 +195,20 @@ def get_project_id(project_name: str, api_key: Optional[str] = None,
         ValueError: If project not found or required parameters are missing
         requests.RequestException: If API request fails
     """
-    # Get API key and URL from parameters or environment
-    if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
-    if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
+    api_key, api_url = _resolve_auth(api_key, api_url)
     
-    if not api_key:
-        raise ValueError("GALILEO_API_KEY is required")
-    if not api_url:
-        raise ValueError("GALILEO_API_URL is required")
+    return _lookup_project_id(project_name, api_key, api_url)
+
+
+@functools.lru_cache(maxsize=256)
+def _lookup_project_id(project_name: str, api_key: str, api_url: str) -> str:
+    """
+    Look up a project ID by name, using the ID cache file before the API.
+    """
+    cache_key = _project_cache_key(project_name, api_key, api_url)
+    project_id = _get_cached_id(cache_key)
+    if project_id is not None:
+        return project_id
     
     # Construct API URL for projects search
     url = f"{api_url}/v2/projects/paginated"
@@ -60,7 +227,7 @@ def get_project_id(project_name: str, api_key: Optional[str] = None,
     }
     
     # Make API request
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
+    response = _SESSION.post(url, headers=headers, json=payload, timeout=30)
     response.raise_for_status()
     data = response.json()
     
@@ -68,13 +235,16 @@ def get_project_id(project_name: str, api_key: Optional[str] = None,
     if not projects:
         raise ValueError(f"Project '{project_name}' not found")
     
-    return projects[0]["id"]
+    project_id = projects[0]["id"]
+    _store_cached_id(cache_key, project_id)
+    return project_id
 
 
 def get_logstream_id(project_id: str, logstream_name: str, api_key: Optional[str] = None, 
                      api_url: Optional[str] = None) -> str:
     """
     Get logstream ID from logstream name.
+    Lookups are cached in memory and in IDS_CACHE_PATH.
     
     Args:
         project_id (str): The project ID
@@ -89,94 +259,138 @@ def get_logstream_id(project_id: str, logstream_name: str, api_key: Optional[str
         ValueError: If logstream not found or required parameters are missing
         requests.RequestException: If API request fails
     """
-    # Get API key and URL from parameters or environment
-    if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
-    if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
+    api_key, api_url = _resolve_auth(api_key, api_url)
     
-    if not api_key:
-        raise ValueError("GALILEO_API_KEY is required")
-    if not api_url:
-        raise ValueError("GALILEO_API_URL is required")
+    return _lookup_logstream_id(project_id, logstream_name, api_key, api_url)
+
+
+@functools.lru_cache(maxsize=256)
+def _lookup_logstream_id(project_id: str, logstream_name: str, api_key: str, api_url: str) -> str:
+    """
+    Look up a logstream ID by name, using the ID cache file before the API.
+    """
+    cache_key = _logstream_cache_key(project_id, logstream_name, api_key, api_url)
+    logstream_id = _get_cached_id(cache_key)
+    if logstream_id is not None:
+        return logstream_id
     
     # Construct API URL for logstreams
     url = f"{api_url}/v2/projects/{project_id}/log_streams"
     headers = {"Galileo-API-Key": api_key}
     
-    # Make API request
-    response = requests.get(url, headers=headers, timeout=30)
+    # Make API request, asking the server to filter by name
+    response = _SESSION.get(url, headers=headers, params={"name": logstream_name}, timeout=30)
     response.raise_for_status()
     data = response.json()
     
-    # Find logstream by name
+    # Find logstream by name, in case the filter isn't applied server-side
     for logstream in data:
         if logstream.get("name") == logstream_name:
+            _store_cached_id(cache_key, logstream["id"])
             return logstream["id"]
     
     raise ValueError(f"Logstream '{logstream_name}' not found in project")
 
 
-def query_traces_by_logstream(project_id: str, logstream_id: str, api_key: Optional[str] = None, 
-                              api_url: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+def _iter_search_pages(endpoint: str, project_id: str, logstream_id: str, api_key: Optional[str] = None,
+                       api_url: Optional[str] = None, limit: int = 100) -> Iterator[List[Dict[str, Any]]]:
     """
-    Query traces using logstream ID with pagination support.
+    Iterate over the pages of records for a logstream from a paginated search endpoint.
+    
+    The first page is requested on its own. If it comes back full and its
+    next_starting_token is the next record offset, up to PAGES_IN_FLIGHT pages are
+    then requested ahead of the one being processed, but not past num_records when the
+    response reports it. If a later response reports a
+    next_starting_token that isn't the next prefetched offset, the prefetched pages
+    are dropped and pagination continues one page at a time from the reported token.
     
     Args:
+        endpoint (str): The search endpoint: "sessions", "traces" or "spans"
         project_id (str): The project ID
         logstream_id (str): The logstream ID
         api_key (str, optional): Galileo API key. If not provided, uses GALILEO_API_KEY env var
         api_url (str, optional): Galileo API URL. If not provided, uses GALILEO_API_URL env var
         limit (int): Maximum number of records per page
         
-    Returns:
-        Dict[str, Any]: All traces data from API (paginated results combined)
+    Yields:
+        List[Dict[str, Any]]: The records of each page
         
     Raises:
-        ValueError: If required parameters are missing
+        ValueError: If required parameters are missing or a response has no records
         requests.RequestException: If API request fails
     """
-    # Get API key and URL from parameters or environment
-    if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
-    if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
+    api_key, api_url = _resolve_auth(api_key, api_url)
     
-    if not api_key:
-        raise ValueError("GALILEO_API_KEY is required")
-    if not api_url:
-        raise ValueError("GALILEO_API_URL is required")
+    # Construct API URL for the search endpoint
+    url = f"{api_url}/v2/projects/{project_id}/{endpoint}/search"
+    headers = {"Galileo-API-Key": api_key, "Content-Type": "application/json"}
+    payload = {"log_stream_id": logstream_id, "limit": limit}
     
-    # Construct API URL for traces search
-    url = f"{api_url}/v2/projects/{project_id}/traces/search"
-    headers = {"Galileo-API-Key": api_key}
+    def fetch_page(starting_token: int) -> Dict[str, Any]:
+        # Pages are fetched concurrently, so each one serializes its own copy of the payload
+        body = orjson.dumps({**payload, "starting_token": starting_token})
+        response = _SESSION.post(url, headers=headers, data=body, timeout=30)
+        response.raise_for_status()
+        return orjson.loads(response.content)
     
-    all_records = []
-    starting_token = 0
+    # Small streams fit in one page, so nothing is prefetched until the first page is full
+    pages_in_flight = 1
     
-    while True:
-        # Query traces by logstream with pagination
-        payload = {
-            "log_stream_id": logstream_id,
-            "limit": limit,
-            "starting_token": starting_token
-        }
-        
-        # Make API request
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Add records to our collection
-        records = data.get("records", [])
-        all_records.extend(records)
+    with ThreadPoolExecutor(max_workers=PAGES_IN_FLIGHT) as executor:
+        pending = deque([(0, executor.submit(fetch_page, 0))])
+        next_prefetch_token = limit
+        num_records = None
         
-        # Check if we have more pages
-        next_token = data.get("next_starting_token")
-        if next_token is None or len(records) < limit:
-            break
-            
-        starting_token = next_token
+        try:
+            while pending:
+                token, future = pending.popleft()
+                data = future.result()
+                
+                try:
+                    records = data["records"]
+                except KeyError:
+                    raise ValueError(f"Malformed {endpoint} search response: missing 'records'") from None
+                next_token = data.get("next_starting_token")
+                got = len(records)
+                yield records
+                
+                # Check if we have more pages
+                if next_token is None or got < limit:
+                    break
+                
+                # Tokens are plain offsets: start prefetching
+                if token == 0 and next_token == limit:
+                    pages_in_flight = PAGES_IN_FLIGHT
+                    num_records = data.get("num_records")
+                
+                # Tokens aren't plain offsets: drop the prefetched pages and stop prefetching
+                expected_token = pending[0][0] if pending else next_prefetch_token
+                if next_token != expected_token:
+                    pages_in_flight = 1
+                    num_records = None
+                    next_prefetch_token = next_token
+                    for _, prefetched in pending:
+                        prefetched.cancel()
+                    pending.clear()
+                
+                # Keep the prefetch window full, without prefetching past the reported total
+                while len(pending) < pages_in_flight and (
+                        not pending or num_records is None or next_prefetch_token < num_records):
+                    pending.append((next_prefetch_token, executor.submit(fetch_page, next_prefetch_token)))
+                    next_prefetch_token += limit
+        finally:
+            for _, prefetched in pending:
+                prefetched.cancel()
+
+
+def _query_by_logstream(endpoint: str, project_id: str, logstream_id: str, api_key: Optional[str],
+                        api_url: Optional[str], limit: int) -> Dict[str, Any]:
+    """
+    Query all records from a logstream search endpoint, with pagination results combined.
+    """
+    # Keep each page as-is and flatten once, instead of growing one list page by page
+    pages = list(_iter_search_pages(endpoint, project_id, logstream_id, api_key, api_url, limit))
+    all_records = list(itertools.chain.from_iterable(pages))
     
     # Return combined data
     return {
@@ -185,6 +399,28 @@ def query_traces_by_logstream(project_id: str, logstream_id: str, api_key: Optio
     }
 
 
+def query_traces_by_logstream(project_id: str, logstream_id: str, api_key: Optional[str] = None, 
+                              api_url: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+    """
+    Query traces using logstream ID with pagination support.
+    
+    Args:
+        project_id (str): The project ID
+        logstream_id (str): The logstream ID
+        api_key (str, optional): Galileo API key. If not provided, uses GALILEO_API_KEY env var
+        api_url (str, optional): Galileo API URL. If not provided, uses GALILEO_API_URL env var
+        limit (int): Maximum number of records per page
+        
+    Returns:
+        Dict[str, Any]: All traces data from API (paginated results combined)
+        
+    Raises:
+        ValueError: If required parameters are missing
+        requests.RequestException: If API request fails
+    """
+    return _query_by_logstream("traces", project_id, logstream_id, api_key, api_url, limit)
+
+
 def query_spans_by_logstream(project_id: str, logstream_id: str, api_key: Optional[str] = None, 
                             api_url: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
     """
@@ -204,53 +440,7 @@ def query_spans_by_logstream(project_id: str, logstream_id: str, api_key: Option
         ValueError: If required parameters are missing
         requests.RequestException: If API request fails
     """
-    # Get API key and URL from parameters or environment
-    if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
-    if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
-    
-    if not api_key:
-        raise ValueError("GALILEO_API_KEY is required")
-    if not api_url:
-        raise ValueError("GALILEO_API_URL is required")
-    
-    # Construct API URL for spans search
-    url = f"{api_url}/v2/projects/{project_id}/spans/search"
-    headers = {"Galileo-API-Key": api_key}
-    
-    all_records = []
-    starting_token = 0
-    
-    while True:
-        # Query spans by logstream with pagination
-        payload = {
-            "log_stream_id": logstream_id,
-            "limit": limit,
-            "starting_token": starting_token
-        }
-        
-        # Make API request
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Add records to our collection
-        records = data.get("records", [])
-        all_records.extend(records)
-        
-        # Check if we have more pages
-        next_token = data.get("next_starting_token")
-        if next_token is None or len(records) < limit:
-            break
-            
-        starting_token = next_token
-    
-    # Return combined data
-    return {
-        "records": all_records,
-        "num_records": len(all_records)
-    }
+    return _query_by_logstream("spans", project_id, logstream_id, api_key, api_url, limit)
 
 
 def query_sessions_by_logstream(project_id: str, logstream_id: str, api_key: Optional[str] = None, 
@@ -272,53 +462,88 @@ def query_sessions_by_logstream(project_id: str, logstream_id: str, api_key: Opt
         ValueError: If required parameters are missing
         requests.RequestException: If API request fails
     """
-    # Get API key and URL from parameters or environment
-    if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
-    if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
-    
-    if not api_key:
-        raise ValueError("GALILEO_API_KEY is required")
-    if not api_url:
-        raise ValueError("GALILEO_API_URL is required")
-    
-    # Construct API URL for sessions search
-    url = f"{api_url}/v2/projects/{project_id}/sessions/search"
-    headers = {"Galileo-API-Key": api_key}
-    
-    all_records = []
-    starting_token = 0
+    return _query_by_logstream("sessions", project_id, logstream_id, api_key, api_url, limit)
+
+
+def _index_sessions(pages: Iterable[List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Map session IDs to session-level metrics, one page of session records at a time.
+    """
+    session_metrics = {}
+    for records in pages:
+        for session in records:
+            session_metrics[session.get("id")] = session.get("metrics", {})
+    return session_metrics
+
+
+def _index_traces(pages: Iterable[List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group formatted traces by session ID, one page of trace records at a time.
+    """
+    traces_by_session = defaultdict(list)
+    for records in pages:
+        for trace in records:
+            traces_by_session[trace.get("session_id")].append({
+                "id": trace.get("id"),
+                "parameters": {
+                    "input": trace.get("input", ""),
+                    "output": trace.get("output", "")
+                },
+                "metrics": trace.get("metrics", {}),
+                "spans": []
+            })
+    return traces_by_session
+
+
+# Pulls (trace_id, id) out of a span record in one C-level call
+_SPAN_IDS = operator.itemgetter("trace_id", "id")
+
+
+def _index_spans(pages: Iterable[List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group formatted spans by trace ID, one page of span records at a time.
+    Spans are joined through their trace, so sessions are not tracked here.
+    """
+    spans_by_trace = defaultdict(list)
+    for records in pages:
+        for span in records:
+            try:
+                trace_id, span_id = _SPAN_IDS(span)
+            except KeyError:
+                # The API schema doesn't guarantee both IDs: fall back to .get, as the other indexes do
+                trace_id, span_id = span.get("trace_id"), span.get("id")
+            spans_by_trace[trace_id].append({
+                "id": span_id,
+                "metrics": span.get("metrics", {})
+            })
+    return spans_by_trace
+
+
+def _build_sessions(session_metrics: Dict[str, Dict[str, Any]], traces_by_session: Dict[str, List[Dict[str, Any]]],
+                    spans_by_trace: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Assemble the session -> trace -> span output structure from the indexes.
+    """
+    # Sessions appear in the order they were first seen in sessions, then traces
+    session_ids = dict.fromkeys(session_metrics)
+    session_ids.update(dict.fromkeys(traces_by_session))
     
-    while True:
-        # Query sessions by logstream with pagination
-        payload = {
-            "log_stream_id": logstream_id,
-            "limit": limit,
-            "starting_token": starting_token
-        }
-        
-        # Make API request
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+    sessions = []
+    for session_id in session_ids:
+        traces = traces_by_session.get(session_id, [])
         
-        # Add records to our collection
-        records = data.get("records", [])
-        all_records.extend(records)
+        # Add spans for each trace from the index (traces start with empty spans)
+        if spans_by_trace:
+            for trace_data in traces:
+                trace_data["spans"] = spans_by_trace.get(trace_data["id"], [])
         
-        # Check if we have more pages
-        next_token = data.get("next_starting_token")
-        if next_token is None or len(records) < limit:
-            break
-            
-        starting_token = next_token
+        sessions.append({
+            "id": session_id,
+            "metrics": session_metrics.get(session_id, {}),
+            "traces": traces
+        })
     
-    # Return combined data
-    return {
-        "records": all_records,
-        "num_records": len(all_records)
-    }
+    return {"sessions": sessions}
 
 
 def format_logstream_metrics_data(sessions_data: Dict[str, Any], traces_data: Dict[str, Any], spans_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -333,88 +558,18 @@ def format_logstream_metrics_data(sessions_data: Dict[str, Any], traces_data: Di
     Returns:
         Dict[str, Any]: Formatted metrics data
     """
-    sessions = []
     sessions_records = sessions_data.get("records", [])
     traces_records = traces_data.get("records", [])
     spans_records = spans_data.get("records", [])
     
-    # Group sessions by session ID
-    session_groups = {}
-    for session in sessions_records:
-        session_id = session.get("id")
-        if session_id not in session_groups:
-            session_groups[session_id] = {
-                "session_record": None,
-                "traces": [],
-                "spans": []
-            }
-        
-        session_groups[session_id]["session_record"] = session
-    
-    # Group traces by session
-    for trace in traces_records:
-        session_id = trace.get("session_id")
-        if session_id not in session_groups:
-            session_groups[session_id] = {
-                "session_record": None,
-                "traces": [],
-                "spans": []
-            }
-        
-        session_groups[session_id]["traces"].append(trace)
-    
-    # Group spans by session
-    for span in spans_records:
-        session_id = span.get("session_id")
-        if session_id not in session_groups:
-            session_groups[session_id] = {
-                "session_record": None,
-                "traces": [],
-                "spans": []
-            }
-        
-        session_groups[session_id]["spans"].append(span)
-    
-    # Format each session
-    for session_id, group in session_groups.items():
-        session_data = {
-            "id": session_id,
-            "metrics": {},
-            "traces": []
-        }
-        
-        # Add session-level metrics
-        if group["session_record"]:
-            session_metrics = group["session_record"].get("metrics", {})
-            session_data["metrics"] = session_metrics
-        
-        # Add traces
-        for trace in group["traces"]:
-            trace_data = {
-                "id": trace.get("id"),
-                "parameters": {
-                    "input": trace.get("input", ""),
-                    "output": trace.get("output", "")
-                },
-                "metrics": trace.get("metrics", {}),
-                "spans": []
-            }
-            
-            # Add spans for this trace
-            trace_id = trace.get("id")
-            for span in group["spans"]:
-                if span.get("trace_id") == trace_id:
-                    span_data = {
-                        "id": span.get("id"),
-                        "metrics": span.get("metrics", {})
-                    }
-                    trace_data["spans"].append(span_data)
-            
-            session_data["traces"].append(trace_data)
-        
-        sessions.append(session_data)
+    if not (sessions_records or traces_records or spans_records):
+        return {"sessions": []}
     
-    return {"sessions": sessions}
+    # Skip the indexing passes for empty record lists (e.g. logstreams without spans)
+    session_metrics = _index_sessions([sessions_records]) if sessions_records else {}
+    traces_by_session = _index_traces([traces_records]) if traces_records else {}
+    spans_by_trace = _index_spans([spans_records]) if spans_records else {}
+    return _build_sessions(session_metrics, traces_by_session, spans_by_trace)
 
 
 def fetch_logstream_metrics(project_name: Optional[str] = None, logstream_name: Optional[str] = None,
@@ -472,28 +627,52 @@ def fetch_logstream_metrics(project_name: Optional[str] = None, logstream_name:
     """
     # Get project and logstream names from parameters or environment
     if project_name is None:
-        project_name = os.environ.get("GALILEO_PROJECT")
+        project_name = _ENV_PROJECT
     if logstream_name is None:
-        logstream_name = os.environ.get("GALILEO_LOG_STREAM")
+        logstream_name = _ENV_LOG_STREAM
     
     if not project_name:
         raise ValueError("GALILEO_PROJECT environment variable is required")
     if not logstream_name:
         raise ValueError("GALILEO_LOG_STREAM environment variable is required")
     
+    api_key, api_url = _resolve_auth(api_key, api_url)
+    
     # Get project ID from name
     project_id = get_project_id(project_name, api_key, api_url)
     
-    # Get logstream ID from name
-    logstream_id = get_logstream_id(project_id, logstream_name, api_key, api_url)
-    
-    # Query sessions, traces, and spans using logstream ID (with pagination)
-    sessions_data = query_sessions_by_logstream(project_id, logstream_id, api_key, api_url, limit)
-    traces_data = query_traces_by_logstream(project_id, logstream_id, api_key, api_url, limit)
-    spans_data = query_spans_by_logstream(project_id, logstream_id, api_key, api_url, limit)
+    try:
+        # Get logstream ID from name
+        logstream_id = get_logstream_id(project_id, logstream_name, api_key, api_url)
+        
+        # Query sessions, traces, and spans using logstream ID (with pagination).
+        # The API has no logstream-wide endpoint that returns sessions with their traces
+        # and spans nested (GET sessions/{id} does, but only one session per request),
+        # so the three flat searches are joined here.
+        # The three queries are independent, so they run concurrently, and each page is
+        # indexed as it arrives instead of collecting all raw records first.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            sessions_future = executor.submit(
+                _index_sessions, _iter_search_pages("sessions", project_id, logstream_id, api_key, api_url, limit))
+            traces_future = executor.submit(
+                _index_traces, _iter_search_pages("traces", project_id, logstream_id, api_key, api_url, limit))
+            spans_future = executor.submit(
+                _index_spans, _iter_search_pages("spans", project_id, logstream_id, api_key, api_url, limit))
+            session_metrics = sessions_future.result()
+            traces_by_session = traces_future.result()
+            spans_by_trace = spans_future.result()
+    except requests.HTTPError as e:
+        # A cached project or logstream ID that no longer exists: drop it, so the next
+        # run looks the names up again
+        if e.response is not None and e.response.status_code == 404:
+            _drop_cached_ids(
+                _project_cache_key(project_name, api_key, api_url),
+                _logstream_cache_key(project_id, logstream_name, api_key, api_url)
+            )
+        raise
     
     # Format the data
-    return format_logstream_metrics_data(sessions_data, traces_data, spans_data)
+    return _build_sessions(session_metrics, traces_by_session, spans_by_trace)
 
 
 # Example usage
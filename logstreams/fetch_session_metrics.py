@@ -5,43 +5,103 @@ Galileo Session Metrics Fetcher
 This module provides functions to fetch and parse session metrics from the Galileo API.
 """
 
+import functools
 import os
+import orjson
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Environment settings, resolved once at import (parameters still override them)
+_ENV_API_KEY = os.environ.get("GALILEO_API_KEY")
+_ENV_API_URL = os.environ.get("GALILEO_API_URL")
+_ENV_PROJECT_ID = os.environ.get("GALILEO_PROJECT_ID")
+_ENV_PROJECT = os.environ.get("GALILEO_PROJECT")
 
-def get_project_id(project_name: str, api_key: Optional[str] = None, 
-                   api_url: Optional[str] = None) -> str:
+# Shared session, so requests to the Galileo API reuse pooled keep-alive connections.
+# Mounted for both schemes, so a plain http:// GALILEO_API_URL (e.g. a local deployment)
+# gets the same pooling and retries.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    # Retry transient failures with exponential backoff, honouring Retry-After.
+    # POSTs are retried too: the only one here is the read-only projects lookup.
+    max_retries=Retry(
+        total=5,
+        connect=3,
+        read=3,
+        status=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        respect_retry_after_header=True
+    )
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Ask for compressed responses. urllib3 only decodes br when brotli is installed,
+# so fall back to gzip without it.
+try:
+    import brotli  # noqa: F401
+    _SESSION.headers["Accept-Encoding"] = "br, gzip"
+except ImportError:
+    _SESSION.headers["Accept-Encoding"] = "gzip"
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_auth(api_key: Optional[str], api_url: Optional[str]) -> Tuple[str, str]:
     """
-    Get project ID from project name.
+    Resolve the Galileo API key and URL from parameters or environment.
     
     Args:
-        project_name (str): The project name
         api_key (str, optional): Galileo API key. If not provided, uses GALILEO_API_KEY env var
         api_url (str, optional): Galileo API URL. If not provided, uses GALILEO_API_URL env var
         
     Returns:
-        str: Project ID
+        Tuple[str, str]: The API key and URL
         
     Raises:
-        ValueError: If project not found or required parameters are missing
-        requests.RequestException: If API request fails
+        ValueError: If the API key or URL is missing
     """
-    # Get API key and URL from parameters or environment
     if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
+        api_key = _ENV_API_KEY
     if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
+        api_url = _ENV_API_URL
     
     if not api_key:
         raise ValueError("GALILEO_API_KEY is required")
     if not api_url:
         raise ValueError("GALILEO_API_URL is required")
     
+    return api_key, api_url
+
+
+def get_project_id(project_name: str, api_key: Optional[str] = None, 
+                   api_url: Optional[str] = None) -> str:
+    """
+    Get project ID from project name.
+    
+    Args:
+        project_name (str): The project name
+        api_key (str, optional): Galileo API key. If not provided, uses GALILEO_API_KEY env var
+        api_url (str, optional): Galileo API URL. If not provided, uses GALILEO_API_URL env var
+        
+    Returns:
+        str: Project ID
+        
+    Raises:
+        ValueError: If project not found or required parameters are missing
+        requests.RequestException: If API request fails
+    """
+    api_key, api_url = _resolve_auth(api_key, api_url)
+    
     # Construct API URL for projects search
     url = f"{api_url}/v2/projects/paginated"
     headers = {"Galileo-API-Key": api_key}
@@ -59,7 +119,7 @@ def get_project_id(project_name: str, api_key: Optional[str] = None,
     }
     
     # Make API request
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
+    response = _SESSION.post(url, headers=headers, json=payload, timeout=30)
     response.raise_for_status()
     data = response.json()
     
@@ -89,25 +149,16 @@ def fetch_session_data(project_id: str, session_id: str, api_key: Optional[str]
         ValueError: If required parameters are missing
         requests.RequestException: If API request fails
     """
-    # Get API key and URL from parameters or environment
-    if api_key is None:
-        api_key = os.environ.get("GALILEO_API_KEY")
-    if api_url is None:
-        api_url = os.environ.get("GALILEO_API_URL")
-    
-    if not api_key:
-        raise ValueError("GALILEO_API_KEY is required")
-    if not api_url:
-        raise ValueError("GALILEO_API_URL is required")
+    api_key, api_url = _resolve_auth(api_key, api_url)
     
     # Construct API URL
     url = f"{api_url}/v2/projects/{project_id}/sessions/{session_id}"
     headers = {"Galileo-API-Key": api_key}
     
     # Make API request
-    response = requests.get(url, headers=headers, timeout=30)
+    response = _SESSION.get(url, headers=headers, timeout=30)
     response.raise_for_status()
-    return response.json()
+    return orjson.loads(response.content)
 
 
 def extract_all_metrics(session_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -138,30 +189,33 @@ def extract_all_metrics(session_data: Dict[str, Any]) -> Dict[str, Any]:
     if metric_info:
         metrics_data['metric_info'] = metric_info
     
-    # Extract trace-level metrics
     traces = session_data.get('traces', [])
-    for i, trace in enumerate(traces):
-        trace_metrics = trace.get('metrics', {})
-        if trace_metrics:
-            metrics_data['trace_metrics'].append({
-                'trace_index': i,
-                'trace_id': trace.get('id'),
-                'trace_type': trace.get('type'),
-                'metrics': trace_metrics
-            })
-        
-        # Extract span-level metrics
-        spans = trace.get('spans', [])
-        for j, span in enumerate(spans):
-            span_metrics = span.get('metrics', {})
-            if span_metrics:
-                metrics_data['span_metrics'].append({
-                    'trace_index': i,
-                    'span_index': j,
-                    'span_id': span.get('id'),
-                    'span_type': span.get('type'),
-                    'metrics': span_metrics
-                })
+    
+    # Extract trace-level metrics, skipping traces without metrics
+    metrics_data['trace_metrics'] = [
+        {
+            'trace_index': i,
+            'trace_id': trace.get('id'),
+            'trace_type': trace.get('type'),
+            'metrics': trace_metrics
+        }
+        for i, trace in enumerate(traces)
+        if (trace_metrics := trace.get('metrics'))
+    ]
+    
+    # Extract span-level metrics, skipping spans without metrics
+    metrics_data['span_metrics'] = [
+        {
+            'trace_index': i,
+            'span_index': j,
+            'span_id': span.get('id'),
+            'span_type': span.get('type'),
+            'metrics': span_metrics
+        }
+        for i, trace in enumerate(traces)
+        for j, span in enumerate(trace.get('spans', []))
+        if (span_metrics := span.get('metrics'))
+    ]
     
     return metrics_data
 
@@ -222,12 +276,12 @@ def get_session_metrics(session_id: str, project_id: Optional[str] = None,
     """
     if project_id is None:
         # Try to get project ID from environment variable first
-        project_id = os.environ.get("GALILEO_PROJECT_ID")
+        project_id = _ENV_PROJECT_ID
         
         # If not found, try to get project ID from project name
         if not project_id:
             if project_name is None:
-                project_name = os.environ.get("GALILEO_PROJECT")
+                project_name = _ENV_PROJECT
             
             if project_name:
                 project_id = get_project_id(project_name)